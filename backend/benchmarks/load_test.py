@@ -0,0 +1,397 @@
+"""
+Load-test main:app under gunicorn and gate the results on latency SLOs.
+
+Boots gunicorn with gunicorn_config.py for every combination of worker
+count, worker class and keepalive, replays a dashboard-like request mix
+and reports throughput, latency percentiles and per-worker RSS. Exits
+with status 1 if any configuration violates an SLO threshold.
+
+Usage (from the backend directory, Linux only):
+    python -m benchmarks.load_test --workers 2 4 8 --keepalive 2 5 \\
+        --concurrency 16 --duration 30 --slo-p95-ms 500
+"""
+import argparse
+import itertools
+import json
+import math
+import os
+import random
+import signal
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+API_PREFIX = '/api/v1'
+
+# Relative weights of the request types in the replayed mix
+DEFAULT_MIX = {'lookup': 60, 'filtered': 35, 'full': 5}
+
+LOOKUP_PATHS = ['/metrics', '/batt-aliases', '/continents', '/model-series', '/climates']
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return float('nan')
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def _child_pids(parent_pid: int) -> List[int]:
+    """Return the pids of all direct children of a process (via /proc)."""
+    children = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # The command name may contain spaces, so split after the closing parenthesis
+        fields = stat.rsplit(')', 1)[1].split()
+        if int(fields[1]) == parent_pid:
+            children.append(int(entry))
+    return children
+
+
+def _rss_mib(pid: int) -> Optional[float]:
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+    return None
+
+
+class RssSampler(threading.Thread):
+    """Periodically records the peak RSS of every gunicorn worker."""
+
+    def __init__(self, master_pid: int, interval: float = 0.5):
+        super().__init__(daemon=True)
+        self.master_pid = master_pid
+        self.interval = interval
+        self.peaks: Dict[int, float] = {}
+        self._stop_event = threading.Event()
+
+    def sample(self) -> None:
+        for pid in _child_pids(self.master_pid):
+            rss = _rss_mib(pid)
+            if rss is not None:
+                self.peaks[pid] = max(rss, self.peaks.get(pid, 0.0))
+
+    def run(self) -> None:
+        while not self._stop_event.is_set():
+            self.sample()
+            self._stop_event.wait(self.interval)
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+        self.sample()
+
+
+class GunicornServer:
+    """Runs main:app under gunicorn with a given configuration."""
+
+    def __init__(self, port: int, workers: int, worker_class: str, keepalive: int, log_dir: str):
+        self.port = port
+        self.workers = workers
+        self.worker_class = worker_class
+        self.keepalive = keepalive
+        short_class = worker_class.rsplit('.', 1)[-1]
+        self.error_log = os.path.join(log_dir, f'gunicorn-{workers}-{short_class}-{keepalive}.log')
+        self.process: Optional[subprocess.Popen] = None
+
+    @property
+    def base_url(self) -> str:
+        return f'http://127.0.0.1:{self.port}'
+
+    def start(self, boot_timeout: float) -> None:
+        # gunicorn_config.py reads these, so the deployment config itself is exercised
+        env = dict(
+            os.environ,
+            HOST='127.0.0.1',
+            PORT=str(self.port),
+            WORKERS=str(self.workers),
+            WORKER_CLASS=self.worker_class,
+            KEEPALIVE=str(self.keepalive),
+        )
+        # Application logging goes to stderr, so capture it alongside gunicorn's own log
+        with open(self.error_log, 'wb') as log:
+            self.process = subprocess.Popen(
+                [
+                    sys.executable, '-m', 'gunicorn', '-c', 'gunicorn_config.py',
+                    '--access-logfile', os.devnull,
+                    '--error-logfile', '-',
+                    'main:app',
+                ],
+                cwd=BACKEND_DIR,
+                env=env,
+                stdout=log,
+                stderr=subprocess.STDOUT,
+            )
+
+        deadline = time.monotonic() + boot_timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"gunicorn exited during startup, see {self.error_log}")
+            booted = len(_child_pids(self.process.pid)) >= self.workers
+            if booted and self._is_ready():
+                return
+            time.sleep(0.5)
+        self.stop()
+        raise RuntimeError(f"gunicorn did not become ready within {boot_timeout}s, see {self.error_log}")
+
+    def _is_ready(self) -> bool:
+        try:
+            return httpx.get(f'{self.base_url}/', timeout=2).status_code == 200
+        except httpx.HTTPError:
+            return False
+
+    def stop(self) -> None:
+        if self.process is None or self.process.poll() is not None:
+            return
+        self.process.send_signal(signal.SIGTERM)
+        try:
+            self.process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+
+Request = Tuple[str, Dict[str, str]]
+
+
+def _get_json(client: httpx.Client, path: str) -> Any:
+    """GET an API path and return its JSON body, raising on error responses."""
+    response = client.get(f'{API_PREFIX}{path}')
+    response.raise_for_status()
+    return response.json()
+
+
+def build_request_pool(base_url: str) -> Dict[str, List[Request]]:
+    """Discover filter values from the API and build the requests for each request type."""
+    with httpx.Client(base_url=base_url, timeout=30) as client:
+        metrics = _get_json(client, '/metrics')['metrics']
+        batt_aliases = _get_json(client, '/batt-aliases')['batt_aliases']
+        continents = [c for c in _get_json(client, '/continents')['continents'] if c]
+        climates = [c for c in _get_json(client, '/climates') if c]
+
+    filtered: List[Request] = []
+    for metric, batt_alias in itertools.product(metrics, batt_aliases):
+        params = {'metric': metric, 'batt_alias': batt_alias}
+        filtered.append((f'{API_PREFIX}/data/filtered', params))
+        filtered.extend((f'{API_PREFIX}/data/filtered', dict(params, continent=c)) for c in continents)
+        filtered.extend((f'{API_PREFIX}/data/filtered', dict(params, climate=c)) for c in climates)
+
+    return {
+        'lookup': [(f'{API_PREFIX}{path}', {}) for path in LOOKUP_PATHS],
+        'filtered': filtered,
+        'full': [(f'{API_PREFIX}/data', {})],
+    }
+
+
+def run_load(
+    base_url: str,
+    pool: Dict[str, List[Request]],
+    mix: Dict[str, int],
+    concurrency: int,
+    duration: float,
+    warmup: float,
+    seed: int
+) -> Dict[str, Any]:
+    """Replay the request mix with a fixed number of concurrent clients."""
+    kinds = [kind for kind in mix if mix[kind] > 0 and pool.get(kind)]
+    if not kinds:
+        raise ValueError("No requests to replay: every weighted request type has an empty pool")
+    weights = [mix[kind] for kind in kinds]
+    lock = threading.Lock()
+    latencies: Dict[str, List[float]] = {kind: [] for kind in kinds}
+    errors = 0
+    measure_from = time.monotonic() + warmup
+    stop_at = measure_from + duration
+
+    def client_loop(client_id: int) -> None:
+        nonlocal errors
+        rng = random.Random(seed + client_id)
+        with httpx.Client(base_url=base_url, timeout=120) as client:
+            while True:
+                start = time.monotonic()
+                if start >= stop_at:
+                    return
+                kind = rng.choices(kinds, weights)[0]
+                path, params = rng.choice(pool[kind])
+                try:
+                    ok = client.get(path, params=params).status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                elapsed_ms = (time.monotonic() - start) * 1000
+                if start < measure_from:
+                    continue
+                with lock:
+                    if ok:
+                        latencies[kind].append(elapsed_ms)
+                    else:
+                        errors += 1
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(client_loop, range(concurrency)))
+
+    all_latencies = sorted(itertools.chain.from_iterable(latencies.values()))
+    total = len(all_latencies) + errors
+    result = {
+        'requests': total,
+        'errors': errors,
+        'error_rate': errors / total if total else 0.0,
+        'throughput_rps': len(all_latencies) / duration,
+        'p50_ms': percentile(all_latencies, 50),
+        'p95_ms': percentile(all_latencies, 95),
+        'p99_ms': percentile(all_latencies, 99),
+        'by_type': {},
+    }
+    for kind, values in latencies.items():
+        values.sort()
+        result['by_type'][kind] = {
+            'requests': len(values),
+            'p50_ms': percentile(values, 50),
+            'p95_ms': percentile(values, 95),
+            'p99_ms': percentile(values, 99),
+        }
+    return result
+
+
+def check_slo(result: Dict[str, Any], args: argparse.Namespace) -> List[str]:
+    """Return a description of every violated SLO threshold."""
+    violations = []
+    for name in ('p50_ms', 'p95_ms', 'p99_ms'):
+        limit = getattr(args, f'slo_{name}')
+        if limit is not None and not result[name] <= limit:
+            violations.append(f"{name} {result[name]:.1f} > {limit:.1f}")
+    if result['error_rate'] > args.slo_error_rate:
+        violations.append(f"error_rate {result['error_rate']:.2%} > {args.slo_error_rate:.2%}")
+    if args.slo_min_rps is not None and result['throughput_rps'] < args.slo_min_rps:
+        violations.append(f"throughput {result['throughput_rps']:.1f} rps < {args.slo_min_rps:.1f}")
+    return violations
+
+
+def _parse_mix(value: str) -> Dict[str, int]:
+    mix = {}
+    for part in value.split(','):
+        kind, _, weight = part.partition('=')
+        if kind not in DEFAULT_MIX or not weight.isdigit():
+            raise argparse.ArgumentTypeError(f"Invalid mix entry: {part}")
+        mix[kind] = int(weight)
+    if not any(mix.values()):
+        raise argparse.ArgumentTypeError("At least one mix weight must be greater than zero")
+    return mix
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sweep = parser.add_argument_group('parameter sweep')
+    sweep.add_argument('--workers', type=int, nargs='+', default=[os.cpu_count() or 1, (os.cpu_count() or 1) * 2 + 1])
+    sweep.add_argument('--worker-classes', nargs='+', default=['uvicorn.workers.UvicornWorker'])
+    sweep.add_argument('--keepalive', type=int, nargs='+', default=[5])
+
+    load = parser.add_argument_group('load')
+    load.add_argument('--concurrency', type=int, default=16, help='Concurrent clients')
+    load.add_argument('--duration', type=float, default=30, help='Measured seconds per configuration')
+    load.add_argument('--warmup', type=float, default=5, help='Unmeasured seconds before each run')
+    load.add_argument('--mix', type=_parse_mix, default=DEFAULT_MIX,
+                      help='Request weights, e.g. lookup=60,filtered=35,full=5')
+    load.add_argument('--seed', type=int, default=42)
+    load.add_argument('--port', type=int, default=18000)
+    load.add_argument('--boot-timeout', type=float, default=60)
+
+    slo = parser.add_argument_group('SLO thresholds')
+    slo.add_argument('--slo-p50-ms', type=float, default=None)
+    slo.add_argument('--slo-p95-ms', type=float, default=500)
+    slo.add_argument('--slo-p99-ms', type=float, default=2000)
+    slo.add_argument('--slo-error-rate', type=float, default=0.0)
+    slo.add_argument('--slo-min-rps', type=float, default=None)
+
+    parser.add_argument('--log-dir', default=str(BACKEND_DIR / 'logs' / 'load_test'),
+                        help='Directory for the gunicorn log of each configuration (kept after the run)')
+    parser.add_argument('--output', help='Write the full report as JSON to this file')
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    if not os.path.isdir('/proc'):
+        print("load_test requires Linux (/proc) for worker RSS sampling", file=sys.stderr)
+        return 2
+
+    report = []
+    configs: List[Tuple[int, str, int]] = list(itertools.product(args.workers, args.worker_classes, args.keepalive))
+    os.makedirs(args.log_dir, exist_ok=True)
+    for index, (workers, worker_class, keepalive) in enumerate(configs):
+        label = f"workers={workers} class={worker_class.rsplit('.', 1)[-1]} keepalive={keepalive}"
+        print(f"[{index + 1}/{len(configs)}] {label}", flush=True)
+        server = GunicornServer(args.port + index, workers, worker_class, keepalive, args.log_dir)
+        sampler: Optional[RssSampler] = None
+        try:
+            server.start(args.boot_timeout)
+            pool = build_request_pool(server.base_url)
+            sampler = RssSampler(server.process.pid)
+            sampler.start()
+            result = run_load(server.base_url, pool, args.mix, args.concurrency,
+                              args.duration, args.warmup, args.seed)
+        except (RuntimeError, httpx.HTTPError, KeyError, ValueError) as e:
+            # Record the failure and move on, so one bad configuration does not abort the sweep
+            message = str(e) if isinstance(e, RuntimeError) else f"{type(e).__name__}: {e} (see {server.error_log})"
+            print(f"  failed: {message}", flush=True)
+            report.append({'workers': workers, 'worker_class': worker_class, 'keepalive': keepalive,
+                           'violations': [message]})
+            continue
+        finally:
+            if sampler is not None:
+                sampler.stop()
+            server.stop()
+
+        rss = sorted(sampler.peaks.values())
+        result.update({
+            'workers': workers,
+            'worker_class': worker_class,
+            'keepalive': keepalive,
+            'worker_rss_mib': rss,
+            'total_rss_mib': sum(rss),
+            'violations': check_slo(result, args),
+        })
+        report.append(result)
+        print(f"  {result['throughput_rps']:.1f} rps  p50 {result['p50_ms']:.1f} ms  "
+              f"p95 {result['p95_ms']:.1f} ms  p99 {result['p99_ms']:.1f} ms  "
+              f"errors {result['errors']}  worker RSS max {max(rss, default=0):.0f} MiB "
+              f"(total {sum(rss):.0f} MiB)", flush=True)
+        for kind, stats in result['by_type'].items():
+            print(f"    {kind:<9} n={stats['requests']:<6} p50 {stats['p50_ms']:.1f} ms  "
+                  f"p95 {stats['p95_ms']:.1f} ms  p99 {stats['p99_ms']:.1f} ms")
+        for violation in result['violations']:
+            print(f"  SLO violated: {violation}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    passing = [r for r in report if not r['violations']]
+    print(f"\n{len(passing)}/{len(report)} configurations met the SLOs")
+    if passing:
+        best = max(passing, key=lambda r: r['throughput_rps'])
+        print(f"Highest throughput within SLO: workers={best['workers']} "
+              f"worker_class={best['worker_class']} keepalive={best['keepalive']} "
+              f"({best['throughput_rps']:.1f} rps, p95 {best['p95_ms']:.1f} ms)")
+    return 0 if len(passing) == len(report) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
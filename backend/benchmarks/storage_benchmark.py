@@ -0,0 +1,141 @@
+"""
+Benchmark the DataService storage backends against each other.
+
+Each backend is measured in its own process. Memory is reported as the
+process RSS, which includes SQLite's and pandas' native allocations.
+
+Usage (from the backend directory, Linux only):
+    python -m benchmarks.storage_benchmark [--backends pandas sqlite] [--repeat 20]
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from config.settings import DATA_FILE  # noqa: E402
+from services.data_service import DataService  # noqa: E402
+
+
+def _time_call(func: Callable[[], object], repeat: int) -> Dict[str, float]:
+    """Run func repeatedly and return latency statistics in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        'min': timings[0],
+        'median': statistics.median(timings),
+        'p95': timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+    }
+
+
+def _build_workload(service: DataService) -> Dict[str, Callable[[], object]]:
+    """Build a representative mix of lookups and filtered queries."""
+    metric = service.get_unique_metrics()[0]
+    batt_alias = service.get_unique_batt_aliases()[0]
+    continent = next(c for c in service.get_unique_continents() if c)
+    climate = next(c for c in service.get_unique_climates() if c)
+    return {
+        'unique_metrics': service.get_unique_metrics,
+        'unique_batt_aliases': service.get_unique_batt_aliases,
+        'unique_model_series': service.get_unique_model_series,
+        'filter_metric_batt': lambda: service.get_data_by_filters(metric, batt_alias),
+        'filter_all': lambda: service.get_data_by_filters(metric, batt_alias, continent, climate),
+        'all_data': service.get_all_data,
+    }
+
+
+def _rss_mib() -> float:
+    """Current resident set size of this process (Linux /proc)."""
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    raise RuntimeError("VmRSS not found in /proc/self/status")
+
+
+def _peak_rss_mib() -> float:
+    # ru_maxrss is reported in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure_backend(csv_path: str, backend: str, sqlite_path: str, repeat: int) -> Dict[str, Any]:
+    """Load one backend in this (fresh) process and measure latency and memory."""
+    result: Dict[str, Any] = {'backend': backend, 'rss_baseline_mib': _rss_mib()}
+
+    start = time.perf_counter()
+    service = DataService(csv_path, backend=backend, sqlite_path=sqlite_path)
+    result['cold_load_ms'] = (time.perf_counter() - start) * 1000
+    result['rss_after_load_mib'] = _rss_mib()
+
+    # A second instance shows the warm start cost (cached DataFrame / existing database)
+    start = time.perf_counter()
+    service = DataService(csv_path, backend=backend, sqlite_path=sqlite_path)
+    result['warm_load_ms'] = (time.perf_counter() - start) * 1000
+
+    result['rows'] = service.backend.row_count()
+    result['operations'] = {name: _time_call(func, repeat) for name, func in _build_workload(service).items()}
+    result['rss_after_workload_mib'] = _rss_mib()
+    result['rss_peak_mib'] = _peak_rss_mib()
+    return result
+
+
+def run_benchmark(csv_path: str, backends: List[str], repeat: int) -> None:
+    # Every backend runs in its own subprocess, so it starts cold and its
+    # RSS is not mixed up with memory held by previously measured backends.
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for backend in backends:
+            sqlite_path = os.path.join(tmp_dir, f'{backend}.sqlite3')
+            completed = subprocess.run(
+                [
+                    sys.executable, '-m', 'benchmarks.storage_benchmark',
+                    '--csv', csv_path, '--repeat', str(repeat),
+                    '--run-backend', backend, '--sqlite-path', sqlite_path,
+                ],
+                cwd=BACKEND_DIR,
+                stdout=subprocess.PIPE,
+                check=True,
+                text=True,
+            )
+            result = json.loads(completed.stdout.strip().splitlines()[-1])
+
+            print(f"\n=== {backend} ({result['rows']} rows) ===")
+            print(f"cold load: {result['cold_load_ms']:9.1f} ms   warm load: {result['warm_load_ms']:9.1f} ms")
+            print(f"RSS: baseline {result['rss_baseline_mib']:.1f} MiB   "
+                  f"after load {result['rss_after_load_mib']:.1f} MiB   "
+                  f"after workload {result['rss_after_workload_mib']:.1f} MiB   "
+                  f"peak {result['rss_peak_mib']:.1f} MiB")
+            print(f"{'operation':<22}{'min ms':>10}{'median ms':>12}{'p95 ms':>10}")
+            for name, stats in result['operations'].items():
+                print(f"{name:<22}{stats['min']:>10.2f}{stats['median']:>12.2f}{stats['p95']:>10.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--csv', default=DATA_FILE, help='Path to the KPI CSV file')
+    parser.add_argument('--backends', nargs='+', default=['pandas', 'sqlite'], help='Backends to compare')
+    parser.add_argument('--repeat', type=int, default=20, help='Repetitions per operation')
+    # Internal: measure a single backend and print the result as JSON
+    parser.add_argument('--run-backend', help=argparse.SUPPRESS)
+    parser.add_argument('--sqlite-path', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.run_backend:
+        print(json.dumps(measure_backend(args.csv, args.run_backend, args.sqlite_path, args.repeat)))
+    else:
+        run_benchmark(args.csv, args.backends, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -20,6 +20,18 @@ DEFAULT_DATA_PATH = os.path.join(BASE_DIR, 'data', 'world_kpi_anonym.csv')
 # Load data file path from environment variable
 DATA_FILE = os.getenv('BACKEND_DATA_PATH', DEFAULT_DATA_PATH)
 
+# Storage backend behind DataService: 'pandas' (in-memory) or 'sqlite' (on-disk)
+STORAGE_BACKEND = os.getenv('BACKEND_STORAGE', 'pandas')
+
+# SQLite database file, built from DATA_FILE on first start
+DEFAULT_SQLITE_PATH = os.path.splitext(DATA_FILE)[0] + '.sqlite3'
+SQLITE_PATH = os.getenv('BACKEND_SQLITE_PATH', DEFAULT_SQLITE_PATH)
+
+# Country geometry (GeoJSON FeatureCollection, e.g. Natural Earth admin 0 countries)
+# used for server-side choropleth payloads
+DEFAULT_GEOMETRY_PATH = os.path.join(BASE_DIR, 'data', 'countries.geojson')
+GEOMETRY_FILE = os.getenv('BACKEND_GEOMETRY_PATH', DEFAULT_GEOMETRY_PATH)
+
 # API settings
 API_V1_PREFIX = '/api/v1'
 
@@ -9,11 +9,11 @@ bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '8000')}"
 
 # Worker processes
 workers = int(os.getenv('WORKERS', multiprocessing.cpu_count() * 2 + 1))
-worker_class = "uvicorn.workers.UvicornWorker"
+worker_class = os.getenv('WORKER_CLASS', "uvicorn.workers.UvicornWorker")
 
-# Timeouts
-timeout = 120
-keepalive = 5
+# Timeouts (use benchmarks/load_test.py to pick values for your hardware)
+timeout = int(os.getenv('TIMEOUT', 120))
+keepalive = int(os.getenv('KEEPALIVE', 5))
 
 # Logging
 accesslog = "logs/access.log"
@@ -19,10 +19,12 @@ from models.data_model import (
     ContinentsResponse,
     FilteredDataResponse,
     Continent,
-    ModelSeriesResponse
+    ModelSeriesResponse,
+    ChoroplethResponse
 )
 from services.data_service import DataService, DataLoadError, InvalidFilterError
-from config.settings import DATA_FILE, CORS_ORIGINS
+from services.geo_service import GeometryService
+from config.settings import DATA_FILE, CORS_ORIGINS, STORAGE_BACKEND, SQLITE_PATH, GEOMETRY_FILE
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -50,11 +52,14 @@ app.add_middleware(
 
 # Initialize data service
 try:
-    data_service = DataService(DATA_FILE)
+    data_service = DataService(DATA_FILE, backend=STORAGE_BACKEND, sqlite_path=SQLITE_PATH)
 except Exception as e:
     logger.error(f"Failed to initialize DataService: {str(e)}")
     raise
 
+# Initialize geometry service (geometries are loaded lazily per detail level)
+geometry_service = GeometryService(GEOMETRY_FILE)
+
 # Initialize cache
 @app.on_event("startup")
 async def startup():
@@ -317,6 +322,75 @@ async def get_filtered_data(
             detail=f"Failed to filter KPI data: {str(e)}"
         )
 
+@app.get("/api/v1/choropleth", response_model=ChoroplethResponse)
+async def get_choropleth(
+    metric: str = Query(..., description="The metric to filter by"),
+    batt_alias: str = Query(..., description="The battery alias to filter by"),
+    continent: Optional[str] = Query(None, description="The continent to filter by"),
+    climate: Optional[str] = Query(None, description="The climate to filter by"),
+    detail: str = Query("medium", description="Geometry detail level: low, medium or high"),
+    classification: str = Query("quantile", description="Color-bin method: quantile or jenks"),
+    classes: int = Query(5, ge=2, le=9, description="Number of color bins")
+) -> ChoroplethResponse:
+    """
+    Get a ready-to-render choropleth payload for the specified filters.
+    
+    Values are averaged per country and joined to simplified country
+    geometries. Features have no geometry if no geometry file is configured.
+    The response is not cached: geometries are already cached once per
+    detail level, and caching every filter combination would keep a copy
+    of them per key.
+    
+    Args:
+        metric: The metric to filter by
+        batt_alias: The battery alias to filter by
+        continent: Optional continent filter
+        climate: Optional climate filter
+        detail: Geometry detail level
+        classification: Method used to compute the color-bin breaks
+        classes: Number of color bins
+        
+    Returns:
+        ChoroplethResponse: GeoJSON FeatureCollection with color-bin breaks
+        
+    Raises:
+        HTTPException: If data loading fails or parameters are invalid
+    """
+    try:
+        logger.info(f"GET /api/v1/choropleth endpoint called with filters: metric='{metric}', batt_alias='{batt_alias}', continent='{continent}', climate='{climate}', detail='{detail}', classification='{classification}', classes={classes}")
+        aggregates = data_service.get_country_aggregates(
+            metric=metric,
+            batt_alias=batt_alias,
+            continent=continent,
+            climate=climate
+        )
+        payload = geometry_service.build_choropleth(
+            aggregates,
+            detail=detail,
+            classification=classification,
+            classes=classes
+        )
+        logger.info(f"Successfully built choropleth with {len(payload['features'])} countries")
+        return ChoroplethResponse(
+            **payload,
+            metric=metric,
+            batt_alias=batt_alias,
+            continent=continent or '',
+            climate=climate or ''
+        )
+    except InvalidFilterError as e:
+        logger.error(f"InvalidFilterError in get_choropleth endpoint: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=400, detail=str(e))
+    except DataLoadError as e:
+        logger.error(f"DataLoadError in get_choropleth endpoint: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Failed to load data")
+    except Exception as e:
+        logger.error(f"Error in get_choropleth endpoint: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to build choropleth: {str(e)}"
+        )
+
 @app.get("/{full_path:path}", include_in_schema=False)
 async def serve_spa(request: Request, full_path: str):
     """
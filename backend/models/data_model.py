@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 from enum import Enum
 
 class Continent(str, Enum):
@@ -62,4 +62,56 @@ class ModelSeriesResponse(BaseModel):
             "example": {
                 "model_series": ["295", "247", "all"]
             }
-        } 
\ No newline at end of file
+        } 
+
+class ChoroplethProperties(BaseModel):
+    iso_a3: str
+    country: str
+    val: float
+    count: int
+    bin: int
+
+class ChoroplethFeature(BaseModel):
+    type: str = "Feature"
+    id: str
+    properties: ChoroplethProperties
+    geometry: Optional[Dict[str, Any]] = None
+
+class ChoroplethResponse(BaseModel):
+    type: str = "FeatureCollection"
+    features: List[ChoroplethFeature]
+    breaks: List[float]
+    classification: str
+    detail: str
+    metric: str
+    batt_alias: str
+    continent: Optional[str] = ''
+    climate: Optional[str] = ''
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "type": "FeatureCollection",
+                "features": [
+                    {
+                        "type": "Feature",
+                        "id": "DEU",
+                        "properties": {
+                            "iso_a3": "DEU",
+                            "country": "Germany",
+                            "val": 123.45,
+                            "count": 1,
+                            "bin": 3
+                        },
+                        "geometry": {"type": "Polygon", "coordinates": [[[5.9, 47.3], [15.0, 47.3], [15.0, 55.1], [5.9, 55.1], [5.9, 47.3]]]}
+                    }
+                ],
+                "breaks": [10.0, 50.0, 100.0, 200.0, 500.0, 1000.0],
+                "classification": "quantile",
+                "detail": "medium",
+                "metric": "variable_1",
+                "batt_alias": "Batt_11",
+                "continent": "",
+                "climate": ""
+            }
+        }
@@ -1,93 +1,23 @@
-import pandas as pd
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from models.data_model import KPIData, Continent
+from services.exceptions import DataLoadError, InvalidFilterError
+from services.storage import StorageBackend, create_backend
 import logging
 
-class DataLoadError(Exception):
-    """Raised when there are issues loading or parsing the data file."""
-    pass
-
-class InvalidFilterError(ValueError):
-    """Raised when filter parameters are invalid or not found in the dataset."""
-    pass
-
 class DataService:
-    # Class-level cache for the DataFrame
-    _df_cache = {}
     _logger = logging.getLogger(__name__)
 
-    def __init__(self, csv_path: str):
+    def __init__(self, csv_path: str, backend: str = 'pandas', sqlite_path: Optional[str] = None):
         self.csv_path = csv_path
+        self.backend_name = backend
+        self.sqlite_path = sqlite_path
         self._load_data()
 
     def _load_data(self) -> None:
-        """Load and validate data from CSV file with caching."""
+        """Initialize the configured storage backend."""
         try:
-            # Check if data is already in cache
-            if self.csv_path in self._df_cache:
-                self._logger.info(f"Using cached DataFrame for {self.csv_path}")
-                self.df = self._df_cache[self.csv_path]
-                return
-
-            # Check if file exists
-            if not pd.io.common.file_exists(self.csv_path):
-                raise DataLoadError(f"Data file not found: {self.csv_path}")
-
-            # Read CSV with specific error handling
-            try:
-                self.df = pd.read_csv(self.csv_path, delimiter=';')
-                self._logger.info(f"First-time data load from {self.csv_path}: {len(self.df)} rows")
-            except pd.errors.EmptyDataError:
-                raise DataLoadError("The CSV file is empty")
-            except pd.errors.ParserError as e:
-                raise DataLoadError(f"Error parsing CSV file: {str(e)}")
-            
-            # Validate required columns
-            required_columns = {'iso_a3', 'country', 'battAlias', 'var', 'val'}
-            missing_columns = required_columns - set(self.df.columns)
-            if missing_columns:
-                raise DataLoadError(f"Missing required columns: {missing_columns}")
-            
-            # Check if climate column exists and create it if not
-            if 'climate' not in self.df.columns:
-                self.df['climate'] = None
-                
-            # Validate and clean data types with specific error handling
-            try:
-                # Handle empty iso_a3 values with placeholder and logging
-                self.df['iso_a3'] = self.df['iso_a3'].fillna('').astype(str)
-                missing_iso_a3 = self.df[self.df['iso_a3'] == '']
-                if not missing_iso_a3.empty:
-                    self._logger.warning(
-                        f"Found {len(missing_iso_a3)} records with missing iso_a3 codes. "
-                        f"Countries affected: {missing_iso_a3['country'].unique().tolist()}"
-                    )
-                    # Assign placeholder 'XXX' to missing iso_a3 values
-                    self.df.loc[self.df['iso_a3'] == '', 'iso_a3'] = 'XXX'
-                
-                # Ensure all iso_a3 values are exactly 3 characters
-                self.df['iso_a3'] = self.df['iso_a3'].str[:3].str.upper()
-                
-                self.df['val'] = pd.to_numeric(self.df['val'], errors='coerce')
-                self.df['cnt_vhcl'] = pd.to_numeric(self.df['cnt_vhcl'], errors='coerce').fillna(0).astype(int)
-                self.df['continent'] = self.df['continent'].fillna('').astype(str)
-                self.df['climate'] = self.df['climate'].fillna('').astype(str)
-                
-                # Replace any NaN values to prevent serialization issues
-                self.df = self.df.fillna('')
-            except Exception as e:
-                raise DataLoadError(f"Error during data type conversion: {str(e)}")
-            
-            # Validate data quality
-            if self.df['val'].isna().all():
-                raise DataLoadError("No valid numeric values found in the 'val' column")
-                
-            self._logger.info(f"Data loaded successfully: {len(self.df)} rows, columns: {list(self.df.columns)}")
-            
-            # Cache the processed DataFrame
-            self._df_cache[self.csv_path] = self.df
-            self._logger.info(f"Cached DataFrame for {self.csv_path}")
-            
+            self.backend: StorageBackend = create_backend(self.backend_name, self.csv_path, self.sqlite_path)
+            self._logger.info(f"Using '{self.backend.name}' storage backend for {self.csv_path}")
         except DataLoadError:
             raise
         except Exception as e:
@@ -100,13 +30,10 @@ class DataService:
         """Get all KPI data."""
         try:
             self._logger.setLevel(logging.DEBUG)
-            self._logger.debug("Converting dataframe to dict")
-            self._logger.debug(f"Dataframe shape: {self.df.shape}")
-            self._logger.debug(f"Dataframe columns: {self.df.columns.tolist()}")
-            self._logger.debug(f"Sample data: {self.df.head(1).to_dict(orient='records')}")
+            self._logger.debug(f"Fetching all records from '{self.backend.name}' backend")
             
-            # Convert to records and validate each record
-            records = self.df.to_dict(orient='records')
+            # Fetch records and validate each record
+            records = self.backend.all_records()
             validated_records = []
             
             for idx, record in enumerate(records):
@@ -156,49 +83,73 @@ class DataService:
     def get_unique_metrics(self) -> List[str]:
         """Get list of unique metrics."""
         try:
-            return self.df['var'].unique().tolist()
-        except KeyError:
-            raise DataLoadError("Column 'var' not found in dataset")
+            return self.backend.distinct('var')
+        except DataLoadError:
+            raise
         except Exception as e:
             raise DataLoadError(f"Error retrieving unique metrics: {str(e)}")
 
     def get_unique_batt_aliases(self) -> List[str]:
         """Get list of unique battery aliases."""
         try:
-            return self.df['battAlias'].unique().tolist()
-        except KeyError:
-            raise DataLoadError("Column 'battAlias' not found in dataset")
+            return self.backend.distinct('battAlias')
+        except DataLoadError:
+            raise
         except Exception as e:
             raise DataLoadError(f"Error retrieving unique battery aliases: {str(e)}")
 
     def get_unique_continents(self) -> List[str]:
         """Get list of unique continents."""
         try:
-            return self.df['continent'].dropna().unique().tolist()
-        except KeyError:
-            raise DataLoadError("Column 'continent' not found in dataset")
+            return self.backend.distinct('continent')
+        except DataLoadError:
+            raise
         except Exception as e:
             raise DataLoadError(f"Error retrieving unique continents: {str(e)}")
 
     def get_unique_climates(self) -> List[str]:
         """Get list of unique climates."""
         try:
-            return self.df['climate'].dropna().unique().tolist()
-        except KeyError:
-            raise DataLoadError("Column 'climate' not found in dataset")
+            return self.backend.distinct('climate')
+        except DataLoadError:
+            raise
         except Exception as e:
             raise DataLoadError(f"Error retrieving unique climates: {str(e)}")
 
     def get_unique_model_series(self) -> List[str]:
         """Get list of unique model series."""
         try:
-            # Drop NaN values and empty strings, then get unique values
-            return self.df['model_series'].dropna().replace('', pd.NA).dropna().unique().tolist()
-        except KeyError:
-            raise DataLoadError("Column 'model_series' not found in dataset")
+            # Empty strings are excluded along with missing values
+            return self.backend.distinct('model_series', drop_empty=True)
+        except DataLoadError:
+            raise
         except Exception as e:
             raise DataLoadError(f"Error retrieving unique model series: {str(e)}")
 
+    def _validate_filters(
+        self,
+        metric: str,
+        batt_alias: str,
+        continent: Optional[str] = None,
+        climate: Optional[str] = None
+    ) -> None:
+        """Raise InvalidFilterError if a filter value does not occur in the dataset."""
+        if not self.backend.has_value('var', metric):
+            self._logger.warning(f"Invalid metric: '{metric}' not in {self.backend.distinct('var')}")
+            raise InvalidFilterError(f"Invalid metric: {metric}")
+            
+        if not self.backend.has_value('battAlias', batt_alias):
+            self._logger.warning(f"Invalid battery alias: '{batt_alias}' not in {self.backend.distinct('battAlias')}")
+            raise InvalidFilterError(f"Invalid battery alias: {batt_alias}")
+            
+        if continent and not self.backend.has_value('continent', continent):
+            self._logger.warning(f"Invalid continent: '{continent}' not in {self.backend.distinct('continent')}")
+            raise InvalidFilterError(f"Invalid continent: {continent}")
+            
+        if climate and not self.backend.has_value('climate', climate):
+            self._logger.warning(f"Invalid climate: '{climate}' not in {self.backend.distinct('climate')}")
+            raise InvalidFilterError(f"Invalid climate: {climate}")
+
     def get_data_by_filters(
         self, 
         metric: str, 
@@ -210,55 +161,58 @@ class DataService:
         self._logger.info(f"Filtering data with: metric='{metric}', batt_alias='{batt_alias}', continent='{continent}', climate='{climate}'")
         
         try:
-            available_metrics = self.df['var'].unique().tolist()
-            if metric not in available_metrics:
-                self._logger.warning(f"Invalid metric: '{metric}' not in {available_metrics}")
-                raise InvalidFilterError(f"Invalid metric: {metric}")
-                
-            available_batt_aliases = self.df['battAlias'].unique().tolist() 
-            if batt_alias not in available_batt_aliases:
-                self._logger.warning(f"Invalid battery alias: '{batt_alias}' not in {available_batt_aliases}")
-                raise InvalidFilterError(f"Invalid battery alias: {batt_alias}")
-                
-            if continent and continent not in self.df['continent'].unique() and continent != '':
-                available_continents = self.df['continent'].unique().tolist()
-                self._logger.warning(f"Invalid continent: '{continent}' not in {available_continents}")
-                raise InvalidFilterError(f"Invalid continent: {continent}")
-                
-            if climate and climate not in self.df['climate'].unique() and climate != '':
-                available_climates = self.df['climate'].unique().tolist()
-                self._logger.warning(f"Invalid climate: '{climate}' not in {available_climates}")
-                raise InvalidFilterError(f"Invalid climate: {climate}")
+            self._validate_filters(metric, batt_alias, continent, climate)
 
-            # Apply filters
-            self._logger.info(f"Applying 'var'='{metric}' and 'battAlias'='{batt_alias}' filters")
-            filtered_df = self.df[
-                (self.df['var'] == metric) &
-                (self.df['battAlias'] == batt_alias) &
-                (self.df['iso_a3'] != 'XXX')  # Filter out records with missing iso_a3 codes
-            ]
-            
-            self._logger.info(f"After initial filter: {len(filtered_df)} records")
+            # Filters are pushed down to the storage backend
+            result = self.backend.query(
+                metric=metric,
+                batt_alias=batt_alias,
+                continent=continent,
+                climate=climate
+            )
             
-            if continent:
-                self._logger.info(f"Applying continent filter: {continent}")
-                filtered_df = filtered_df[filtered_df['continent'] == continent]
-                self._logger.info(f"After continent filter: {len(filtered_df)} records")
-                
-            if climate:
-                self._logger.info(f"Applying climate filter: {climate}")
-                filtered_df = filtered_df[filtered_df['climate'] == climate]
-                self._logger.info(f"After climate filter: {len(filtered_df)} records")
-            
-            if filtered_df.empty:
+            if not result:
                 self._logger.warning(f"No data found for the specified filters - metric: {metric}, batt_alias: {batt_alias}, continent: {continent}, climate: {climate}")
                 # Don't raise an exception, just return empty list
                 return []
             
-            result = filtered_df.to_dict(orient='records')
             self._logger.info(f"Returning {len(result)} filtered records")
             return result
         except InvalidFilterError:
             raise
         except Exception as e:
-            raise DataLoadError(f"Error filtering data: {str(e)}") 
\ No newline at end of file
+            raise DataLoadError(f"Error filtering data: {str(e)}")
+
+    def get_country_aggregates(
+        self,
+        metric: str,
+        batt_alias: str,
+        continent: Optional[str] = None,
+        climate: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Get the mean value and record count per country for the given filters."""
+        self._logger.info(f"Aggregating data by country with: metric='{metric}', batt_alias='{batt_alias}', continent='{continent}', climate='{climate}'")
+        
+        try:
+            self._validate_filters(metric, batt_alias, continent, climate)
+
+            # Aggregation is pushed down to the storage backend
+            rows = self.backend.aggregate_by_country(
+                metric=metric,
+                batt_alias=batt_alias,
+                continent=continent,
+                climate=climate
+            )
+            return [
+                {
+                    'iso_a3': str(row['iso_a3']),
+                    'country': str(row['country']),
+                    'val': float(row['val']),
+                    'count': int(row['count'])
+                }
+                for row in rows
+            ]
+        except InvalidFilterError:
+            raise
+        except Exception as e:
+            raise DataLoadError(f"Error aggregating data: {str(e)}")
@@ -0,0 +1,7 @@
+class DataLoadError(Exception):
+    """Raised when there are issues loading or parsing the data file."""
+    pass
+
+class InvalidFilterError(ValueError):
+    """Raised when filter parameters are invalid or not found in the dataset."""
+    pass
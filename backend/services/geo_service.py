@@ -0,0 +1,282 @@
+import bisect
+import json
+import logging
+import math
+import os
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from services.exceptions import DataLoadError, InvalidFilterError
+
+# Douglas-Peucker tolerance (degrees) and coordinate precision (decimal places)
+# per detail level. Coarser levels yield much smaller payloads.
+DETAIL_LEVELS = {
+    'low': {'tolerance': 0.5, 'precision': 1},
+    'medium': {'tolerance': 0.1, 'precision': 2},
+    'high': {'tolerance': 0.01, 'precision': 3},
+}
+
+CLASSIFICATION_METHODS = ('quantile', 'jenks')
+
+# Feature properties checked (in order) for the ISO 3166-1 alpha-3 code;
+# values of '-99' are treated as missing
+ISO_PROPERTIES = ('iso_a3', 'ISO_A3', 'ADM0_A3', 'ISO3', 'iso3')
+
+Point = List[float]
+Ring = List[Point]
+
+
+def _point_segment_distance(point: Point, start: Point, end: Point) -> float:
+    """Distance from point to the segment start-end (planar, in degrees)."""
+    dx, dy = end[0] - start[0], end[1] - start[1]
+    if dx == 0 and dy == 0:
+        return math.hypot(point[0] - start[0], point[1] - start[1])
+    t = ((point[0] - start[0]) * dx + (point[1] - start[1]) * dy) / (dx * dx + dy * dy)
+    t = max(0.0, min(1.0, t))
+    return math.hypot(point[0] - (start[0] + t * dx), point[1] - (start[1] + t * dy))
+
+
+def simplify_line(points: Sequence[Point], tolerance: float) -> Ring:
+    """Simplify a polyline with the Douglas-Peucker algorithm (iterative)."""
+    if len(points) < 3:
+        return [list(p) for p in points]
+
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        max_dist, index = 0.0, 0
+        for i in range(first + 1, last):
+            dist = _point_segment_distance(points[i], points[first], points[last])
+            if dist > max_dist:
+                max_dist, index = dist, i
+        if max_dist > tolerance:
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+    return [list(p) for p, k in zip(points, keep) if k]
+
+
+def quantize_ring(ring: Sequence[Point], precision: int) -> Ring:
+    """Round coordinates to the given precision and drop repeated points."""
+    result: Ring = []
+    for point in ring:
+        rounded = [round(point[0], precision), round(point[1], precision)]
+        if not result or rounded != result[-1]:
+            result.append(rounded)
+    return result
+
+
+def _encode_ring(ring: Sequence[Point], tolerance: float, precision: int) -> Optional[Ring]:
+    """Simplify and quantize a closed ring; returns None if it collapses."""
+    encoded = quantize_ring(simplify_line(ring, tolerance), precision)
+    if len(encoded) < 4:
+        # Small islands vanish at coarse tolerances; keep their quantized outline
+        encoded = quantize_ring(ring, precision)
+    if len(encoded) < 4:
+        return None
+    if encoded[0] != encoded[-1]:
+        encoded.append(list(encoded[0]))
+    return encoded
+
+
+def _encode_polygon(rings: Sequence[Ring], tolerance: float, precision: int) -> Optional[List[Ring]]:
+    if not rings:
+        return None
+    exterior = _encode_ring(rings[0], tolerance, precision)
+    if exterior is None:
+        return None
+    holes = [_encode_ring(ring, tolerance, precision) for ring in rings[1:]]
+    return [exterior] + [hole for hole in holes if hole is not None]
+
+
+def encode_geometry(geometry: Dict[str, Any], tolerance: float, precision: int) -> Optional[Dict[str, Any]]:
+    """Return a simplified, quantized copy of a (Multi)Polygon GeoJSON geometry."""
+    if not geometry:
+        return None
+    geom_type = geometry.get('type')
+    if geom_type == 'Polygon':
+        polygons = [geometry['coordinates']]
+    elif geom_type == 'MultiPolygon':
+        polygons = geometry['coordinates']
+    else:
+        return None
+
+    encoded = [p for p in (_encode_polygon(rings, tolerance, precision) for rings in polygons) if p]
+    if not encoded:
+        return None
+    if len(encoded) == 1:
+        return {'type': 'Polygon', 'coordinates': encoded[0]}
+    return {'type': 'MultiPolygon', 'coordinates': encoded}
+
+
+def _jenks_breaks(values: List[float], n_classes: int) -> List[float]:
+    """Fisher-Jenks natural breaks optimization on sorted values."""
+    n = len(values)
+    lower = [[0] * (n_classes + 1) for _ in range(n + 1)]
+    variance = [[math.inf] * (n_classes + 1) for _ in range(n + 1)]
+    for j in range(1, n_classes + 1):
+        lower[1][j] = 1
+        variance[1][j] = 0.0
+
+    for l in range(2, n + 1):
+        s1 = s2 = 0.0
+        w = 0
+        for m in range(1, l + 1):
+            i = l - m + 1
+            val = values[i - 1]
+            s1 += val
+            s2 += val * val
+            w += 1
+            v = s2 - (s1 * s1) / w
+            if i > 1:
+                for j in range(2, n_classes + 1):
+                    if variance[l][j] >= v + variance[i - 1][j - 1]:
+                        lower[l][j] = i
+                        variance[l][j] = v + variance[i - 1][j - 1]
+        lower[l][1] = 1
+        variance[l][1] = v
+
+    breaks = [0.0] * (n_classes + 1)
+    breaks[n_classes] = values[-1]
+    breaks[0] = values[0]
+    k = n
+    for j in range(n_classes, 1, -1):
+        index = lower[k][j] - 2
+        breaks[j - 1] = values[index]
+        k = lower[k][j] - 1
+    return breaks
+
+
+def compute_breaks(values: Sequence[float], n_classes: int, method: str = 'quantile') -> List[float]:
+    """
+    Compute class breaks for a choropleth color scale.
+
+    Returns n_classes + 1 ascending edges from the minimum to the maximum
+    value. Fewer classes are used if there are fewer distinct values.
+    """
+    if method not in CLASSIFICATION_METHODS:
+        raise InvalidFilterError(f"Invalid classification: {method}")
+    clean = sorted(float(v) for v in values if v is not None and not math.isnan(v))
+    if not clean:
+        return []
+    n_classes = max(1, min(n_classes, len(set(clean))))
+
+    if method == 'jenks' and n_classes > 1:
+        breaks = _jenks_breaks(clean, n_classes)
+    else:
+        breaks = np.quantile(clean, np.linspace(0, 1, n_classes + 1)).tolist()
+    return [float(b) for b in breaks]
+
+
+def assign_bin(value: float, breaks: Sequence[float]) -> int:
+    """Return the zero-based class index of a value given the class edges."""
+    if len(breaks) < 2:
+        return 0
+    # Class i covers (breaks[i], breaks[i + 1]]; the minimum falls into class 0
+    index = bisect.bisect_left(breaks, value, 1, len(breaks) - 1) - 1
+    return max(0, min(index, len(breaks) - 2))
+
+
+class GeometryService:
+    """
+    Serves country geometries from a GeoJSON file, simplified per detail level.
+
+    The source file is read once and each detail level is encoded on first
+    request and cached for the lifetime of the process. Without a geometry
+    file, features are returned without geometry and the client falls back
+    to its built-in ISO-3 country shapes.
+    """
+
+    _logger = logging.getLogger(__name__)
+
+    def __init__(self, geojson_path: Optional[str]):
+        self.geojson_path = geojson_path
+        self._source: Optional[Dict[str, Dict[str, Any]]] = None
+        self._encoded: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def available(self) -> bool:
+        return bool(self.geojson_path) and os.path.exists(self.geojson_path)
+
+    def _load_source(self) -> Dict[str, Dict[str, Any]]:
+        """Read the GeoJSON file into a mapping of iso_a3 to geometry."""
+        if self._source is not None:
+            return self._source
+        if not self.available:
+            self._logger.warning(f"Geometry file not found: {self.geojson_path}")
+            self._source = {}
+            return self._source
+        try:
+            with open(self.geojson_path, encoding='utf-8') as f:
+                collection = json.load(f)
+        except (OSError, ValueError) as e:
+            raise DataLoadError(f"Error reading geometry file: {str(e)}")
+
+        source: Dict[str, Dict[str, Any]] = {}
+        for feature in collection.get('features', []):
+            properties = feature.get('properties') or {}
+            # Natural Earth uses '-99' for unassigned codes, so fall through to the next property
+            iso = next((properties[key] for key in ISO_PROPERTIES if properties.get(key) not in (None, '', '-99')), None)
+            if not iso or not feature.get('geometry'):
+                continue
+            source[str(iso).upper()[:3]] = feature['geometry']
+        self._logger.info(f"Loaded {len(source)} country geometries from {self.geojson_path}")
+        self._source = source
+        return self._source
+
+    def get_geometries(self, detail: str) -> Dict[str, Dict[str, Any]]:
+        """Return simplified geometries keyed by iso_a3 for a detail level."""
+        if detail not in DETAIL_LEVELS:
+            raise InvalidFilterError(f"Invalid detail level: {detail}")
+        if detail in self._encoded:
+            return self._encoded[detail]
+        with self._lock:
+            if detail not in self._encoded:
+                params = DETAIL_LEVELS[detail]
+                encoded = {}
+                for iso, geometry in self._load_source().items():
+                    simplified = encode_geometry(geometry, params['tolerance'], params['precision'])
+                    if simplified is not None:
+                        encoded[iso] = simplified
+                self._encoded[detail] = encoded
+                self._logger.info(f"Encoded {len(encoded)} geometries for detail level '{detail}'")
+        return self._encoded[detail]
+
+    def build_choropleth(
+        self,
+        aggregates: List[Dict[str, Any]],
+        detail: str = 'medium',
+        classification: str = 'quantile',
+        classes: int = 5
+    ) -> Dict[str, Any]:
+        """Join per-country values to geometries and attach color-bin breaks."""
+        geometries = self.get_geometries(detail)
+        breaks = compute_breaks([row['val'] for row in aggregates], classes, classification)
+
+        features = []
+        for row in aggregates:
+            features.append({
+                'type': 'Feature',
+                'id': row['iso_a3'],
+                'properties': {
+                    'iso_a3': row['iso_a3'],
+                    'country': row['country'],
+                    'val': row['val'],
+                    'count': row['count'],
+                    'bin': assign_bin(row['val'], breaks),
+                },
+                'geometry': geometries.get(row['iso_a3']),
+            })
+
+        return {
+            'type': 'FeatureCollection',
+            'features': features,
+            'breaks': breaks,
+            'classification': classification,
+            'detail': detail,
+        }
@@ -0,0 +1,436 @@
+import fcntl
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from services.exceptions import DataLoadError
+
+# Columns exposed through the API (see models.data_model.KPIData)
+KPI_COLUMNS = ['iso_a3', 'country', 'battAlias', 'var', 'val', 'cnt_vhcl', 'continent', 'climate']
+
+# Columns that may be used in filters or distinct lookups
+FILTER_COLUMNS = {'var', 'battAlias', 'continent', 'climate', 'model_series'}
+
+# Filter columns first, then the remaining KPI columns so filtered queries
+# can be answered from the index alone
+COVERING_INDEX_COLUMNS = ['var', 'battAlias', 'continent', 'climate', 'iso_a3', 'country', 'val', 'cnt_vhcl']
+
+_logger = logging.getLogger(__name__)
+
+
+def _to_records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Convert a DataFrame to records, mapping missing values to None."""
+    if df['val'].isna().any():
+        df = df.astype(object).where(df.notna(), None)
+    return df.to_dict(orient='records')
+
+
+def load_kpi_dataframe(csv_path: str) -> pd.DataFrame:
+    """Read the KPI CSV file and return a cleaned DataFrame."""
+    # Check if file exists
+    if not pd.io.common.file_exists(csv_path):
+        raise DataLoadError(f"Data file not found: {csv_path}")
+
+    # Read CSV with specific error handling
+    try:
+        df = pd.read_csv(csv_path, delimiter=';')
+        _logger.info(f"Data load from {csv_path}: {len(df)} rows")
+    except pd.errors.EmptyDataError:
+        raise DataLoadError("The CSV file is empty")
+    except pd.errors.ParserError as e:
+        raise DataLoadError(f"Error parsing CSV file: {str(e)}")
+
+    # Validate required columns
+    required_columns = {'iso_a3', 'country', 'battAlias', 'var', 'val'}
+    missing_columns = required_columns - set(df.columns)
+    if missing_columns:
+        raise DataLoadError(f"Missing required columns: {missing_columns}")
+
+    # Check if climate column exists and create it if not
+    if 'climate' not in df.columns:
+        df['climate'] = None
+
+    # Validate and clean data types with specific error handling
+    try:
+        # Handle empty iso_a3 values with placeholder and logging
+        df['iso_a3'] = df['iso_a3'].fillna('').astype(str)
+        missing_iso_a3 = df[df['iso_a3'] == '']
+        if not missing_iso_a3.empty:
+            _logger.warning(
+                f"Found {len(missing_iso_a3)} records with missing iso_a3 codes. "
+                f"Countries affected: {missing_iso_a3['country'].unique().tolist()}"
+            )
+            # Assign placeholder 'XXX' to missing iso_a3 values
+            df.loc[df['iso_a3'] == '', 'iso_a3'] = 'XXX'
+
+        # Ensure all iso_a3 values are exactly 3 characters
+        df['iso_a3'] = df['iso_a3'].str[:3].str.upper()
+
+        df['val'] = pd.to_numeric(df['val'], errors='coerce').astype(float)
+        df['cnt_vhcl'] = pd.to_numeric(df['cnt_vhcl'], errors='coerce').fillna(0).astype(int)
+        df['continent'] = df['continent'].fillna('').astype(str)
+        df['climate'] = df['climate'].fillna('').astype(str)
+
+        # Replace NaN in the text columns to prevent serialization issues;
+        # 'val' stays numeric with NaN marking missing values
+        text_columns = df.columns.difference(['val'])
+        df[text_columns] = df[text_columns].fillna('')
+    except Exception as e:
+        raise DataLoadError(f"Error during data type conversion: {str(e)}")
+
+    # Validate data quality
+    if df['val'].isna().all():
+        raise DataLoadError("No valid numeric values found in the 'val' column")
+
+    _logger.info(f"Data loaded successfully: {len(df)} rows, columns: {list(df.columns)}")
+    return df
+
+
+class StorageBackend(ABC):
+    """
+    Interface for the storage engines behind DataService.
+
+    Backends are read-only. Filters are applied by the engine itself, so
+    only matching rows are materialized as Python records.
+    """
+
+    name = 'base'
+
+    @abstractmethod
+    def distinct(self, column: str, drop_empty: bool = False) -> List[Any]:
+        """Return the unique values of a column in order of first appearance."""
+        ...
+
+    @abstractmethod
+    def has_value(self, column: str, value: Any) -> bool:
+        """Check whether at least one row has the given value in a column."""
+        ...
+
+    @abstractmethod
+    def query(
+        self,
+        metric: str,
+        batt_alias: str,
+        continent: Optional[str] = None,
+        climate: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Return KPI records matching the filters, excluding placeholder iso_a3 codes."""
+        ...
+
+    @abstractmethod
+    def aggregate_by_country(
+        self,
+        metric: str,
+        batt_alias: str,
+        continent: Optional[str] = None,
+        climate: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Return the mean value and value count per iso_a3 for the filtered rows.
+
+        Missing values are excluded from both; countries without any value
+        are omitted.
+        """
+        ...
+
+    @abstractmethod
+    def all_records(self) -> List[Dict[str, Any]]:
+        """Return every row of the dataset as a record."""
+        ...
+
+    @abstractmethod
+    def row_count(self) -> int:
+        """Return the number of rows in the dataset."""
+        ...
+
+    @staticmethod
+    def _check_column(column: str) -> None:
+        if column not in FILTER_COLUMNS:
+            raise DataLoadError(f"Column '{column}' not found in dataset")
+
+
+class PandasBackend(StorageBackend):
+    """Keeps the whole dataset as an in-memory DataFrame."""
+
+    name = 'pandas'
+
+    # Class-level cache for the DataFrame
+    _df_cache: Dict[str, pd.DataFrame] = {}
+
+    def __init__(self, csv_path: str):
+        self.csv_path = csv_path
+        if csv_path in self._df_cache:
+            _logger.info(f"Using cached DataFrame for {csv_path}")
+        else:
+            self._df_cache[csv_path] = load_kpi_dataframe(csv_path)
+            _logger.info(f"Cached DataFrame for {csv_path}")
+        self.df = self._df_cache[csv_path]
+
+    def distinct(self, column: str, drop_empty: bool = False) -> List[Any]:
+        self._check_column(column)
+        if column not in self.df.columns:
+            raise DataLoadError(f"Column '{column}' not found in dataset")
+        values = self.df[column].dropna()
+        if drop_empty:
+            values = values.replace('', pd.NA).dropna()
+        return values.unique().tolist()
+
+    def has_value(self, column: str, value: Any) -> bool:
+        self._check_column(column)
+        return bool((self.df[column] == value).any())
+
+    def _mask(
+        self,
+        metric: str,
+        batt_alias: str,
+        continent: Optional[str] = None,
+        climate: Optional[str] = None
+    ) -> pd.Series:
+        mask = (
+            (self.df['var'] == metric) &
+            (self.df['battAlias'] == batt_alias) &
+            (self.df['iso_a3'] != 'XXX')  # Filter out records with missing iso_a3 codes
+        )
+        if continent:
+            mask &= self.df['continent'] == continent
+        if climate:
+            mask &= self.df['climate'] == climate
+        return mask
+
+    def query(
+        self,
+        metric: str,
+        batt_alias: str,
+        continent: Optional[str] = None,
+        climate: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        mask = self._mask(metric, batt_alias, continent, climate)
+        return _to_records(self.df.loc[mask, KPI_COLUMNS])
+
+    def aggregate_by_country(
+        self,
+        metric: str,
+        batt_alias: str,
+        continent: Optional[str] = None,
+        climate: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        mask = self._mask(metric, batt_alias, continent, climate) & self.df['val'].notna()
+        grouped = self.df.loc[mask].groupby('iso_a3', sort=False).agg(
+            country=('country', 'min'),
+            val=('val', 'mean'),
+            count=('val', 'count')
+        )
+        return grouped.reset_index().to_dict(orient='records')
+
+    def all_records(self) -> List[Dict[str, Any]]:
+        return _to_records(self.df)
+
+    def row_count(self) -> int:
+        return len(self.df)
+
+
+class SQLiteBackend(StorageBackend):
+    """
+    Serves the dataset from an on-disk SQLite database.
+
+    The database is built from the CSV file on first use (or whenever the
+    CSV is newer) and opened read-only afterwards, so workers only keep
+    SQLite's page cache resident instead of a full DataFrame. A covering
+    index on the filter columns lets filtered queries run as index-only
+    scans.
+    """
+
+    name = 'sqlite'
+    TABLE = 'kpi'
+
+    # Bumped whenever the table layout changes, so older databases are rebuilt
+    SCHEMA_VERSION = 1
+
+    def __init__(self, csv_path: str, db_path: str):
+        self.csv_path = csv_path
+        self.db_path = db_path
+        self._local = threading.local()
+        self._ensure_database()
+
+    def _is_stale(self) -> bool:
+        if not os.path.exists(self.db_path):
+            return True
+        if not pd.io.common.file_exists(self.csv_path):
+            # Serve the existing database even if the source CSV is gone
+            return False
+        if os.path.getmtime(self.csv_path) > os.path.getmtime(self.db_path):
+            return True
+        try:
+            conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True)
+            try:
+                version = conn.execute("PRAGMA user_version").fetchone()[0]
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            return True
+        return version != self.SCHEMA_VERSION
+
+    def _ensure_database(self) -> None:
+        """Build the database from the CSV file if it is missing or out of date."""
+        if not self._is_stale():
+            _logger.info(f"Using existing SQLite database {self.db_path}")
+            return
+
+        db_dir = os.path.dirname(os.path.abspath(self.db_path))
+        os.makedirs(db_dir, exist_ok=True)
+
+        # All gunicorn workers start at once; let one of them build the
+        # database while the others wait and then reuse it.
+        with open(f"{self.db_path}.lock", 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                if not self._is_stale():
+                    _logger.info(f"Using SQLite database {self.db_path} built by another process")
+                    return
+                self._build_database(db_dir)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _build_database(self, db_dir: str) -> None:
+        """Load the CSV file and write it to a fresh database at db_path."""
+        df = load_kpi_dataframe(self.csv_path)
+
+        # Build into a temporary file and swap it in atomically, so that
+        # concurrently starting workers never see a half-written database.
+        fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=db_dir)
+        os.close(fd)
+        try:
+            conn = sqlite3.connect(tmp_path)
+            try:
+                # Declare 'val' as REAL so missing values are stored as NULL
+                # and the column keeps numeric affinity
+                df.to_sql(self.TABLE, conn, index=False, if_exists='replace', dtype={'val': 'REAL'})
+                conn.execute(
+                    f"CREATE INDEX idx_{self.TABLE}_filter ON {self.TABLE} "
+                    f"({', '.join(COVERING_INDEX_COLUMNS)})"
+                )
+                for column in sorted(FILTER_COLUMNS - {'var'}):
+                    if column in df.columns:
+                        conn.execute(f"CREATE INDEX idx_{self.TABLE}_{column} ON {self.TABLE} ({column})")
+                conn.execute("ANALYZE")
+                conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+                conn.commit()
+            finally:
+                conn.close()
+            os.replace(tmp_path, self.db_path)
+        except sqlite3.Error as e:
+            raise DataLoadError(f"Error building SQLite database: {str(e)}")
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        _logger.info(f"Built SQLite database {self.db_path} with {len(df)} rows")
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared across threads
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            try:
+                conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True)
+            except sqlite3.Error as e:
+                raise DataLoadError(f"Error opening SQLite database: {str(e)}")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def _columns(self) -> List[str]:
+        rows = self._conn.execute(f"PRAGMA table_info({self.TABLE})").fetchall()
+        return [row['name'] for row in rows]
+
+    def distinct(self, column: str, drop_empty: bool = False) -> List[Any]:
+        self._check_column(column)
+        if column not in self._columns():
+            raise DataLoadError(f"Column '{column}' not found in dataset")
+        condition = f"WHERE {column} IS NOT NULL"
+        if drop_empty:
+            condition += f" AND {column} != ''"
+        rows = self._conn.execute(
+            f"SELECT {column} FROM {self.TABLE} {condition} "
+            f"GROUP BY {column} ORDER BY MIN(rowid)"
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def has_value(self, column: str, value: Any) -> bool:
+        self._check_column(column)
+        row = self._conn.execute(
+            f"SELECT 1 FROM {self.TABLE} WHERE {column} = ? LIMIT 1", (value,)
+        ).fetchone()
+        return row is not None
+
+    @staticmethod
+    def _where(
+        metric: str,
+        batt_alias: str,
+        continent: Optional[str] = None,
+        climate: Optional[str] = None
+    ) -> Tuple[str, List[Any]]:
+        clauses = ["var = ?", "battAlias = ?", "iso_a3 != 'XXX'"]
+        params: List[Any] = [metric, batt_alias]
+        if continent:
+            clauses.append("continent = ?")
+            params.append(continent)
+        if climate:
+            clauses.append("climate = ?")
+            params.append(climate)
+        return ' AND '.join(clauses), params
+
+    def query(
+        self,
+        metric: str,
+        batt_alias: str,
+        continent: Optional[str] = None,
+        climate: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        where, params = self._where(metric, batt_alias, continent, climate)
+        rows = self._conn.execute(
+            f"SELECT {', '.join(KPI_COLUMNS)} FROM {self.TABLE} "
+            f"WHERE {where} ORDER BY rowid",
+            params
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def aggregate_by_country(
+        self,
+        metric: str,
+        batt_alias: str,
+        continent: Optional[str] = None,
+        climate: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        where, params = self._where(metric, batt_alias, continent, climate)
+        rows = self._conn.execute(
+            f"SELECT iso_a3, MIN(country) AS country, AVG(val) AS val, COUNT(val) AS count "
+            f"FROM {self.TABLE} WHERE {where} AND val IS NOT NULL "
+            f"GROUP BY iso_a3 ORDER BY MIN(rowid)",
+            params
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def all_records(self) -> List[Dict[str, Any]]:
+        rows = self._conn.execute(f"SELECT * FROM {self.TABLE} ORDER BY rowid").fetchall()
+        return [dict(row) for row in rows]
+
+    def row_count(self) -> int:
+        return self._conn.execute(f"SELECT COUNT(*) FROM {self.TABLE}").fetchone()[0]
+
+
+def create_backend(name: str, csv_path: str, sqlite_path: Optional[str] = None) -> StorageBackend:
+    """Instantiate the storage backend configured by name."""
+    name = (name or 'pandas').lower()
+    if name == PandasBackend.name:
+        return PandasBackend(csv_path)
+    if name == SQLiteBackend.name:
+        if not sqlite_path:
+            sqlite_path = os.path.splitext(csv_path)[0] + '.sqlite3'
+        return SQLiteBackend(csv_path, sqlite_path)
+    raise ValueError(f"Unknown storage backend: {name}")
@@ -0,0 +1,19 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Make the backend packages (services, models, config) importable
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+CSV_HEADER = 'battAlias;country;continent;climate;iso_a3;model_series;var;val;descr;cnt_vhcl'
+
+
+@pytest.fixture
+def write_csv(tmp_path):
+    """Write semicolon-separated KPI rows to a CSV file and return its path."""
+    def _write(rows, name='kpi.csv'):
+        path = tmp_path / name
+        path.write_text('\n'.join([CSV_HEADER] + rows) + '\n', encoding='utf-8')
+        return str(path)
+    return _write
@@ -0,0 +1,285 @@
+import asyncio
+import itertools
+import json
+import math
+import random
+
+import httpx
+import pytest
+
+from services.data_service import DataService
+from services.exceptions import InvalidFilterError
+from services.geo_service import (
+    DETAIL_LEVELS,
+    GeometryService,
+    assign_bin,
+    compute_breaks,
+    encode_geometry,
+    quantize_ring,
+    simplify_line,
+)
+
+KPI_ROWS = [
+    'Batt_11;Sweden;Europe;coldland;SWE;295;variable_1;10;Beschreibung_1;1',
+    'Batt_11;Germany;Europe;normal;DEU;247;variable_1;20;Beschreibung_1;2',
+    'Batt_11;Brazil;South America;hotland;BRA;247;variable_1;40;Beschreibung_1;3',
+]
+
+
+def circle(cx, cy, radius, points=400):
+    ring = [
+        [cx + radius * math.cos(2 * math.pi * i / points), cy + radius * math.sin(2 * math.pi * i / points)]
+        for i in range(points)
+    ]
+    return ring + [list(ring[0])]
+
+
+def square(x, y, size):
+    return [[x, y], [x + size, y], [x + size, y + size], [x, y + size], [x, y]]
+
+
+def write_geojson(path, features):
+    path.write_text(json.dumps({
+        'type': 'FeatureCollection',
+        'features': [
+            {'type': 'Feature', 'properties': properties, 'geometry': geometry}
+            for properties, geometry in features
+        ],
+    }), encoding='utf-8')
+    return str(path)
+
+
+def sdcm(values, breaks):
+    """Sum of squared deviations from the class means for the given class edges."""
+    total = 0.0
+    for i in range(len(breaks) - 1):
+        members = [v for v in values if (v > breaks[i] or i == 0) and v <= breaks[i + 1]]
+        mean = sum(members) / len(members)
+        total += sum((v - mean) ** 2 for v in members)
+    return total
+
+
+def brute_force_sdcm(values, n_classes):
+    """Smallest SDCM over every way of cutting the sorted values into n_classes groups."""
+    best = math.inf
+    for cuts in itertools.combinations(range(1, len(values)), n_classes - 1):
+        bounds = (0,) + cuts + (len(values),)
+        total = 0.0
+        for start, end in zip(bounds, bounds[1:]):
+            members = values[start:end]
+            mean = sum(members) / len(members)
+            total += sum((v - mean) ** 2 for v in members)
+        best = min(best, total)
+    return best
+
+
+def ring_is_closed(ring):
+    return len(ring) >= 4 and ring[0] == ring[-1]
+
+
+def test_simplify_line_drops_collinear_points():
+    line = [[0.0, 0.0], [1.0, 0.0], [2.0, 0.0], [3.0, 0.0]]
+
+    assert simplify_line(line, 0.01) == [[0.0, 0.0], [3.0, 0.0]]
+
+
+def test_simplify_line_keeps_points_beyond_tolerance():
+    line = [[0.0, 0.0], [1.0, 1.0], [2.0, 0.0]]
+
+    assert simplify_line(line, 0.5) == line
+    assert simplify_line(line, 2.0) == [[0.0, 0.0], [2.0, 0.0]]
+
+
+def test_quantize_ring_rounds_and_drops_repeated_points():
+    ring = [[1.04, 2.01], [1.01, 2.04], [1.26, 2.0], [1.04, 2.01]]
+
+    assert quantize_ring(ring, 1) == [[1.0, 2.0], [1.3, 2.0], [1.0, 2.0]]
+
+
+def test_coarser_detail_levels_have_fewer_points():
+    geometry = {'type': 'Polygon', 'coordinates': [circle(10, 50, 5)]}
+
+    counts = {}
+    for level, params in DETAIL_LEVELS.items():
+        encoded = encode_geometry(geometry, params['tolerance'], params['precision'])
+        assert encoded['type'] == 'Polygon'
+        assert ring_is_closed(encoded['coordinates'][0])
+        counts[level] = len(encoded['coordinates'][0])
+
+    assert counts['low'] < counts['medium'] < counts['high']
+
+
+def test_small_islands_are_kept_at_low_detail():
+    geometry = {'type': 'MultiPolygon', 'coordinates': [[circle(15, 62, 5)], [circle(18, 57, 0.3, 20)]]}
+    params = DETAIL_LEVELS['low']
+
+    encoded = encode_geometry(geometry, params['tolerance'], params['precision'])
+
+    assert encoded['type'] == 'MultiPolygon'
+    assert len(encoded['coordinates']) == 2
+    assert all(ring_is_closed(polygon[0]) for polygon in encoded['coordinates'])
+
+
+def test_multipolygon_collapses_to_polygon_when_parts_vanish():
+    geometry = {'type': 'MultiPolygon', 'coordinates': [[square(0, 0, 10)], [square(20, 20, 0.001)]]}
+    params = DETAIL_LEVELS['low']
+
+    encoded = encode_geometry(geometry, params['tolerance'], params['precision'])
+
+    assert encoded == {'type': 'Polygon', 'coordinates': [square(0.0, 0.0, 10.0)]}
+
+
+def test_encode_geometry_ignores_non_polygon_geometries():
+    assert encode_geometry({'type': 'Point', 'coordinates': [1.0, 2.0]}, 0.1, 2) is None
+    assert encode_geometry(None, 0.1, 2) is None
+
+
+def test_quantile_breaks():
+    assert compute_breaks([1, 2, 3, 4, 5], 4, 'quantile') == [1.0, 2.0, 3.0, 4.0, 5.0]
+
+
+def test_jenks_breaks_separate_clusters():
+    values = [1, 2, 3, 10, 11, 12, 50, 51]
+
+    assert compute_breaks(values, 3, 'jenks') == [1.0, 3.0, 12.0, 51.0]
+
+
+def test_jenks_breaks_are_optimal():
+    rng = random.Random(0)
+    for _ in range(50):
+        values = sorted(rng.sample(range(1000), rng.randint(4, 9)))
+        n_classes = rng.randint(2, min(4, len(values) - 1))
+
+        breaks = compute_breaks(values, n_classes, 'jenks')
+
+        assert sdcm(values, breaks) == pytest.approx(brute_force_sdcm(values, n_classes))
+
+
+@pytest.mark.parametrize('method', ['quantile', 'jenks'])
+def test_breaks_with_duplicate_values(method):
+    assert compute_breaks([5, 5, 5, 5], 3, method) == [5.0, 5.0]
+    assert len(compute_breaks([1, 1, 1, 2], 5, method)) == 3
+
+
+def test_breaks_ignore_missing_values():
+    assert compute_breaks([1.0, None, float('nan'), 3.0], 2, 'quantile') == [1.0, 2.0, 3.0]
+    assert compute_breaks([], 5, 'quantile') == []
+
+
+def test_breaks_reject_unknown_method():
+    with pytest.raises(InvalidFilterError):
+        compute_breaks([1, 2, 3], 2, 'equal')
+
+
+@pytest.mark.parametrize('value, expected', [
+    (-5, 0), (0, 0), (10, 0), (10.01, 1), (20, 1), (25, 2), (30, 2), (40, 2),
+])
+def test_assign_bin_at_class_edges(value, expected):
+    assert assign_bin(value, [0, 10, 20, 30]) == expected
+
+
+def test_assign_bin_without_classes():
+    assert assign_bin(5, []) == 0
+    assert assign_bin(5, [5.0]) == 0
+
+
+def test_geometries_are_cached_per_detail_level(tmp_path):
+    service = GeometryService(write_geojson(tmp_path / 'countries.geojson', [
+        ({'ISO_A3': 'DEU'}, {'type': 'Polygon', 'coordinates': [circle(10, 51, 4)]}),
+    ]))
+
+    low = service.get_geometries('low')
+
+    assert service.get_geometries('low') is low
+    assert service.get_geometries('high') is not low
+    with pytest.raises(InvalidFilterError):
+        service.get_geometries('ultra')
+
+
+@pytest.mark.parametrize('backend', ['pandas', 'sqlite'])
+def test_choropleth_with_missing_value(backend, write_csv, tmp_path):
+    csv_path = write_csv([
+        'Batt_11;Sweden;Europe;coldland;SWE;295;variable_1;10;Beschreibung_1;1',
+        'Batt_11;Sweden;Europe;coldland;SWE;295;variable_1;;Beschreibung_1;1',
+        'Batt_11;Germany;Europe;normal;DEU;247;variable_1;20;Beschreibung_1;2',
+    ])
+    service = DataService(csv_path, backend=backend, sqlite_path=str(tmp_path / 'kpi.sqlite3'))
+
+    aggregates = service.get_country_aggregates('variable_1', 'Batt_11')
+    payload = GeometryService(None).build_choropleth(aggregates, classes=2)
+
+    values = {f['id']: f['properties']['val'] for f in payload['features']}
+    assert values == {'SWE': pytest.approx(10.0), 'DEU': pytest.approx(20.0)}
+    assert payload['breaks'] == [10.0, 15.0, 20.0]
+
+
+def test_iso_code_falls_back_when_iso_a3_is_unassigned(tmp_path):
+    square = [[[5.0, 47.0], [15.0, 47.0], [15.0, 55.0], [5.0, 55.0], [5.0, 47.0]]]
+    geojson = tmp_path / 'countries.geojson'
+    geojson.write_text(json.dumps({
+        'type': 'FeatureCollection',
+        'features': [{
+            'type': 'Feature',
+            'properties': {'ISO_A3': '-99', 'ADM0_A3': 'DEU'},
+            'geometry': {'type': 'Polygon', 'coordinates': square},
+        }],
+    }), encoding='utf-8')
+
+    geometries = GeometryService(str(geojson)).get_geometries('high')
+
+    assert list(geometries) == ['DEU']
+    assert geometries['DEU']['coordinates'] == square
+
+
+@pytest.fixture
+def api(monkeypatch, write_csv, tmp_path):
+    """Issue requests against main.app backed by a small dataset and geometry file."""
+    import main
+
+    monkeypatch.setattr(main, 'data_service', DataService(write_csv(KPI_ROWS)))
+    monkeypatch.setattr(main, 'geometry_service', GeometryService(write_geojson(tmp_path / 'countries.geojson', [
+        ({'ISO_A3': 'DEU'}, {'type': 'Polygon', 'coordinates': [square(5, 47, 10)]}),
+        ({'ISO_A3': 'SWE'}, {'type': 'Polygon', 'coordinates': [square(11, 55, 10)]}),
+    ])))
+
+    def get(path, **params):
+        async def request():
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+                return await client.get(path, params=params)
+        return asyncio.run(request())
+
+    return get
+
+
+def test_choropleth_endpoint_joins_values_and_geometry(api):
+    response = api('/api/v1/choropleth', metric='variable_1', batt_alias='Batt_11', classes=2)
+
+    assert response.status_code == 200
+    payload = response.json()
+    features = {f['id']: f for f in payload['features']}
+    assert payload['type'] == 'FeatureCollection'
+    assert payload['breaks'] == [10.0, 20.0, 40.0]
+    assert [features[iso]['properties']['bin'] for iso in ('SWE', 'DEU', 'BRA')] == [0, 0, 1]
+    assert features['DEU']['geometry']['type'] == 'Polygon'
+    assert features['BRA']['geometry'] is None
+
+
+@pytest.mark.parametrize('params, message', [
+    ({'detail': 'ultra'}, 'Invalid detail level: ultra'),
+    ({'classification': 'equal'}, 'Invalid classification: equal'),
+    ({'batt_alias': 'Batt_99'}, 'Invalid battery alias: Batt_99'),
+])
+def test_choropleth_endpoint_rejects_invalid_parameters(api, params, message):
+    query = dict({'metric': 'variable_1', 'batt_alias': 'Batt_11'}, **params)
+
+    response = api('/api/v1/choropleth', **query)
+
+    assert response.status_code == 400
+    assert response.json() == {'detail': message}
+
+
+def test_choropleth_endpoint_validates_class_count(api):
+    response = api('/api/v1/choropleth', metric='variable_1', batt_alias='Batt_11', classes=1)
+
+    assert response.status_code == 422
@@ -0,0 +1,187 @@
+import multiprocessing
+import os
+import sqlite3
+import time
+
+import pytest
+
+from services.exceptions import DataLoadError
+from services.storage import KPI_COLUMNS, SQLiteBackend, StorageBackend, create_backend
+
+ROWS_WITH_MISSING_VAL = [
+    'Batt_11;Sweden;Europe;coldland;SWE;295;variable_1;10;Beschreibung_1;1',
+    'Batt_11;Sweden;Europe;coldland;SWE;295;variable_1;;Beschreibung_1;1',
+    'Batt_11;Germany;Europe;normal;DEU;247;variable_1;20;Beschreibung_1;2',
+    'Batt_20;Brazil;South America;hotland;BRA;;variable_1;40;Beschreibung_1;3',
+    'Batt_11;Brazil;South America;hotland;BRA;all;variable_2;50;Beschreibung_2;4',
+    'Batt_11;Unknown;;;;295;variable_1;60;Beschreibung_1;5',
+    'Batt_11;Norway;Europe;coldland;NOR;295;variable_1;;Beschreibung_1;1',
+]
+
+
+@pytest.fixture(params=['pandas', 'sqlite'])
+def backend(request, write_csv, tmp_path):
+    csv_path = write_csv(ROWS_WITH_MISSING_VAL)
+    return create_backend(request.param, csv_path, str(tmp_path / 'kpi.sqlite3'))
+
+
+def _countries(records):
+    return [r['iso_a3'] for r in records]
+
+
+def test_query_keeps_val_numeric(backend):
+    records = backend.query('variable_1', 'Batt_11')
+
+    assert [r['val'] for r in records] == [10.0, None, 20.0, None]
+    assert all(isinstance(r['val'], float) for r in records if r['val'] is not None)
+
+
+def test_query_returns_kpi_columns_without_placeholder_iso(backend):
+    records = backend.query('variable_1', 'Batt_11')
+
+    assert _countries(records) == ['SWE', 'SWE', 'DEU', 'NOR']
+    assert set(records[0]) == set(KPI_COLUMNS)
+
+
+@pytest.mark.parametrize('continent, climate, expected', [
+    ('Europe', None, ['SWE', 'SWE', 'DEU', 'NOR']),
+    ('South America', None, []),
+    (None, 'normal', ['DEU']),
+    ('Europe', 'coldland', ['SWE', 'SWE', 'NOR']),
+    ('', '', ['SWE', 'SWE', 'DEU', 'NOR']),
+])
+def test_query_pushes_down_continent_and_climate(backend, continent, climate, expected):
+    records = backend.query('variable_1', 'Batt_11', continent=continent, climate=climate)
+
+    assert _countries(records) == expected
+
+
+def test_distinct_keeps_first_appearance_order(backend):
+    assert backend.distinct('var') == ['variable_1', 'variable_2']
+    assert backend.distinct('battAlias') == ['Batt_11', 'Batt_20']
+    assert backend.distinct('continent') == ['Europe', 'South America', '']
+    assert backend.distinct('climate') == ['coldland', 'normal', 'hotland', '']
+
+
+def test_distinct_drop_empty(backend):
+    assert backend.distinct('model_series') == ['295', '247', '', 'all']
+    assert backend.distinct('model_series', drop_empty=True) == ['295', '247', 'all']
+
+
+def test_distinct_rejects_unknown_column(backend):
+    with pytest.raises(DataLoadError):
+        backend.distinct('descr')
+
+
+@pytest.mark.parametrize('column, value, expected', [
+    ('var', 'variable_2', True),
+    ('var', 'variable_9', False),
+    ('battAlias', 'Batt_20', True),
+    ('continent', 'Asia', False),
+    ('climate', 'hotland', True),
+])
+def test_has_value(backend, column, value, expected):
+    assert backend.has_value(column, value) is expected
+
+
+def test_all_records_keep_text_columns_filled(backend):
+    records = backend.all_records()
+
+    assert len(records) == backend.row_count() == len(ROWS_WITH_MISSING_VAL)
+    assert records[1]['val'] is None
+    assert records[1]['descr'] == 'Beschreibung_1'
+    assert records[3]['model_series'] == ''
+    assert records[5]['iso_a3'] == 'XXX'
+
+
+def test_aggregate_by_country_skips_missing_values(backend):
+    aggregates = {row['iso_a3']: row for row in backend.aggregate_by_country('variable_1', 'Batt_11')}
+
+    assert aggregates['SWE']['val'] == pytest.approx(10.0)
+    assert aggregates['SWE']['count'] == 1
+    assert aggregates['DEU']['val'] == pytest.approx(20.0)
+    assert aggregates['DEU']['count'] == 1
+
+
+def test_aggregate_by_country_omits_countries_without_values(backend):
+    assert _countries(backend.aggregate_by_country('variable_1', 'Batt_11')) == ['SWE', 'DEU']
+
+
+def test_aggregate_by_country_pushes_down_filters(backend):
+    assert _countries(backend.aggregate_by_country('variable_1', 'Batt_11', climate='normal')) == ['DEU']
+    assert _countries(backend.aggregate_by_country('variable_1', 'Batt_20', continent='South America')) == ['BRA']
+    assert backend.aggregate_by_country('variable_1', 'Batt_20', continent='Europe') == []
+
+
+def test_sqlite_reuses_fresh_database(write_csv, tmp_path, monkeypatch):
+    csv_path = write_csv(ROWS_WITH_MISSING_VAL)
+    db_path = str(tmp_path / 'kpi.sqlite3')
+    SQLiteBackend(csv_path, db_path)
+
+    def fail_build(self, db_dir):
+        raise AssertionError('database should not be rebuilt')
+
+    monkeypatch.setattr(SQLiteBackend, '_build_database', fail_build)
+
+    assert SQLiteBackend(csv_path, db_path).row_count() == len(ROWS_WITH_MISSING_VAL)
+
+
+def test_sqlite_rebuilds_when_csv_is_newer(write_csv, tmp_path):
+    csv_path = write_csv(ROWS_WITH_MISSING_VAL)
+    db_path = str(tmp_path / 'kpi.sqlite3')
+    SQLiteBackend(csv_path, db_path)
+
+    write_csv(ROWS_WITH_MISSING_VAL[:2])
+    newer = os.path.getmtime(db_path) + 10
+    os.utime(csv_path, (newer, newer))
+
+    assert SQLiteBackend(csv_path, db_path).row_count() == 2
+
+
+def test_sqlite_rebuilds_on_schema_version_change(write_csv, tmp_path, monkeypatch):
+    csv_path = write_csv(ROWS_WITH_MISSING_VAL)
+    db_path = str(tmp_path / 'kpi.sqlite3')
+    SQLiteBackend(csv_path, db_path)
+
+    monkeypatch.setattr(SQLiteBackend, 'SCHEMA_VERSION', SQLiteBackend.SCHEMA_VERSION + 1)
+    SQLiteBackend(csv_path, db_path)
+
+    conn = sqlite3.connect(db_path)
+    try:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == SQLiteBackend.SCHEMA_VERSION
+    finally:
+        conn.close()
+
+
+def test_incomplete_backend_fails_on_creation():
+    class IncompleteBackend(StorageBackend):
+        def distinct(self, column, drop_empty=False):
+            return []
+
+    with pytest.raises(TypeError, match='abstract'):
+        IncompleteBackend()
+
+
+def test_concurrent_workers_build_sqlite_database_once(write_csv, tmp_path, monkeypatch):
+    csv_path = write_csv(ROWS_WITH_MISSING_VAL)
+    db_path = str(tmp_path / 'kpi.sqlite3')
+    builds = tmp_path / 'builds.log'
+    build_database = SQLiteBackend._build_database
+
+    def recording_build(self, db_dir):
+        with open(builds, 'a') as f:
+            f.write('build\n')
+        time.sleep(0.2)
+        build_database(self, db_dir)
+
+    monkeypatch.setattr(SQLiteBackend, '_build_database', recording_build)
+
+    context = multiprocessing.get_context('fork')
+    workers = [context.Process(target=SQLiteBackend, args=(csv_path, db_path)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert [worker.exitcode for worker in workers] == [0, 0, 0, 0]
+    assert builds.read_text().splitlines() == ['build']